@@ -18,35 +18,83 @@ Usage:
 
 import os
 import sys
-import io
 import wave
+import struct
 import json
+import queue
 import logging
+import logging.handlers
 import asyncio
+import time
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any, Union
 from contextlib import asynccontextmanager
 
 import numpy as np
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import Response, StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel, Field
 
-# Configure logging
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib parser
+    orjson = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting (including tracebacks) to the listener thread."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# Configure logging: records are written by a background QueueListener started in lifespan
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(
+    logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+)
+log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    handlers=[DeferredQueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
 
+# Imported after logging is configured so genie_tts' own basicConfig() is a no-op
+import genie_tts as genie
+
 # Model configuration
 MODELS_DIR = Path(os.environ.get("MODELS_DIR", "/app/models"))
 VOICES: Dict[str, Dict[str, Any]] = {}
 
+# ORT optimized-model cache, one subdirectory per voice; MODELS_DIR may be read-only at runtime
+ORT_CACHE_DIR = Path(os.environ.get(
+    "ORT_CACHE_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "genie-tts", "ort"),
+))
+# Older genie-tts releases do not accept optimized_model_dir
+SUPPORTS_ORT_CACHE = "optimized_model_dir" in inspect.signature(genie.load_character).parameters
+
+# Warmup configuration: "all", a comma-separated list of voice names, or empty to disable
+WARMUP_VOICES = os.environ.get("WARMUP_VOICES", "all").strip()
+WARMUP_TEXT = "。"
+
+# Request limits
+MAX_INPUT_CHARS = int(os.environ.get("MAX_INPUT_CHARS", 4096))
+MAX_AUDIO_BYTES = int(os.environ.get("MAX_AUDIO_BYTES", 50_000_000))
+
 # Audio settings
 SAMPLE_RATE = 32000
 CHANNELS = 1
 BYTES_PER_SAMPLE = 2
+# Placeholder data size for streamed WAV, keeps the RIFF size at 0xFFFFFFFF
+STREAMING_DATA_SIZE = 0xFFFFFFFF - 36
+# 44-byte PCM WAV header layout
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
 
 
 class SpeechRequest(BaseModel):
@@ -63,16 +111,25 @@ class ErrorResponse(BaseModel):
     error: Dict[str, Any]
 
 
+@functools.lru_cache(maxsize=None)
+def _read_voice_config(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a config.json file, memoized by path and modification time."""
+    with open(config_path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data.decode("utf-8"))
+
+
 def load_voice_config(voice_dir: Path) -> Optional[Dict[str, Any]]:
     """Load voice configuration from a directory."""
     config_path = voice_dir / "config.json"
-    if not config_path.exists():
+    try:
+        mtime_ns = config_path.stat().st_mtime_ns
+    except FileNotFoundError:
         logger.warning(f"Config file not found: {config_path}")
         return None
     
     try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
+        config = dict(_read_voice_config(str(config_path), mtime_ns))
         
         # Validate required fields
         required_fields = ["reference_audio", "reference_text", "language"]
@@ -104,30 +161,60 @@ def discover_voices() -> Dict[str, Dict[str, Any]]:
         logger.warning(f"Models directory not found: {MODELS_DIR}")
         return voices
     
-    for voice_dir in MODELS_DIR.iterdir():
-        if voice_dir.is_dir():
-            voice_name = voice_dir.name
-            config = load_voice_config(voice_dir)
-            if config:
-                voices[voice_name] = config
-                logger.info(f"Loaded voice: {voice_name} (language: {config.get('language', 'unknown')})")
+    # os.scandir reuses the directory entry type instead of a stat() per entry
+    with os.scandir(MODELS_DIR) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                voice_name = entry.name
+                config = load_voice_config(Path(entry.path))
+                if config:
+                    voices[voice_name] = config
+                    logger.info(f"Loaded voice: {voice_name} (language: {config.get('language', 'unknown')})")
     
     return voices
 
 
+def _load_voice(item):
+    """Load one voice model, returning (voice_name, error)."""
+    voice_name, config = item
+    try:
+        logger.info(f"Loading voice model: {voice_name}")
+        kwargs = {}
+        if SUPPORTS_ORT_CACHE:
+            kwargs["optimized_model_dir"] = str(ORT_CACHE_DIR / voice_name)
+        genie.load_character(
+            character_name=voice_name,
+            onnx_model_dir=config["onnx_dir"],
+            language=config["language"],
+            **kwargs
+        )
+        return voice_name, None
+    except Exception as e:
+        return voice_name, e
+
+
+def warm_ort_cache() -> int:
+    """Load every voice once so the ORT optimized models are written to ORT_CACHE_DIR (run at image build)."""
+    if not SUPPORTS_ORT_CACHE:
+        logger.error("Installed genie-tts does not support optimized_model_dir")
+        return 1
+    genie.download_genie_data()
+    voices = discover_voices()
+    failed = 0
+    for voice_name, error in map(_load_voice, voices.items()):
+        if error is not None:
+            logger.error(f"Failed to warm ORT cache for {voice_name}: {error}")
+            failed += 1
+    logger.info(f"ORT cache warmed for {len(voices) - failed}/{len(voices)} voices in {ORT_CACHE_DIR}")
+    return 1 if failed else 0
+
+
 def initialize_genie():
     """Initialize Genie-TTS engine and load all voice models."""
     global VOICES
     
     logger.info("Initializing Genie-TTS engine...")
     
-    # Import genie_tts
-    try:
-        import genie_tts as genie
-    except ImportError as e:
-        logger.error(f"Failed to import genie_tts: {e}")
-        raise
-    
     # Download Genie data if needed
     logger.info("Checking Genie data...")
     genie.download_genie_data()
@@ -139,17 +226,22 @@ def initialize_genie():
         logger.warning("No voice models found!")
         return
     
-    # Load each voice model
-    for voice_name, config in VOICES.items():
+    if not SUPPORTS_ORT_CACHE:
+        logger.warning("Installed genie-tts does not support optimized_model_dir, ORT model cache disabled")
+    
+    # Load voice models in parallel, ORT session creation for each voice is independent
+    with ThreadPoolExecutor(max_workers=min(4, len(VOICES))) as executor:
+        results = list(executor.map(_load_voice, list(VOICES.items())))
+    
+    for voice_name, error in results:
+        if error is not None:
+            logger.error(f"Failed to load voice model {voice_name}: {error}")
+            del VOICES[voice_name]
+            continue
+        
+        # Set reference audio (sequentially, the shared HuBERT model is loaded on first use)
+        config = VOICES[voice_name]
         try:
-            logger.info(f"Loading voice model: {voice_name}")
-            genie.load_character(
-                character_name=voice_name,
-                onnx_model_dir=config["onnx_dir"],
-                language=config["language"]
-            )
-            
-            # Set reference audio
             ref_audio_path = os.path.join(config["voice_dir"], config["reference_audio"])
             genie.set_reference_audio(
                 character_name=voice_name,
@@ -163,17 +255,49 @@ def initialize_genie():
             logger.error(f"Failed to load voice model {voice_name}: {e}")
             del VOICES[voice_name]
     
+    # Warm up ONNX sessions so the first request doesn't pay first-inference latency
+    warmup_voices()
+    
     logger.info(f"Genie-TTS initialized with {len(VOICES)} voice(s)")
 
 
+def warmup_voices():
+    """Run a tiny synthesis per voice to allocate ORT arenas and compile kernels."""
+    if not WARMUP_VOICES or WARMUP_VOICES.lower() == "none":
+        logger.info("Voice warmup disabled")
+        return
+    
+    if WARMUP_VOICES.lower() == "all":
+        voice_names = list(VOICES.keys())
+    else:
+        voice_names = [v.strip() for v in WARMUP_VOICES.split(",") if v.strip() in VOICES]
+    
+    for voice_name in voice_names:
+        try:
+            start_time = time.perf_counter()
+            genie.tts(
+                character_name=voice_name,
+                text=WARMUP_TEXT,
+                play=False,
+                split_sentence=False,
+                save_path=None
+            )
+            logger.info(f"Voice warmup completed: {voice_name} ({time.perf_counter() - start_time:.2f}s)")
+        except Exception as e:
+            logger.warning(f"Voice warmup failed for {voice_name}: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
-    initialize_genie()
+    log_listener.start()
+    # Run in a worker thread so the event loop isn't blocked
+    await asyncio.get_running_loop().run_in_executor(None, initialize_genie)
     yield
     # Shutdown
     logger.info("Shutting down Genie-TTS server...")
+    log_listener.stop()
 
 
 # Create FastAPI app
@@ -227,28 +351,14 @@ async def list_models():
 
 def generate_wav_header(data_size: int) -> bytes:
     """Generate WAV file header."""
-    header = io.BytesIO()
-    
-    # RIFF header
-    header.write(b'RIFF')
-    header.write((data_size + 36).to_bytes(4, 'little'))  # File size - 8
-    header.write(b'WAVE')
-    
-    # fmt chunk
-    header.write(b'fmt ')
-    header.write((16).to_bytes(4, 'little'))  # Chunk size
-    header.write((1).to_bytes(2, 'little'))   # Audio format (PCM)
-    header.write((CHANNELS).to_bytes(2, 'little'))  # Number of channels
-    header.write((SAMPLE_RATE).to_bytes(4, 'little'))  # Sample rate
-    header.write((SAMPLE_RATE * CHANNELS * BYTES_PER_SAMPLE).to_bytes(4, 'little'))  # Byte rate
-    header.write((CHANNELS * BYTES_PER_SAMPLE).to_bytes(2, 'little'))  # Block align
-    header.write((BYTES_PER_SAMPLE * 8).to_bytes(2, 'little'))  # Bits per sample
-    
-    # data chunk
-    header.write(b'data')
-    header.write(data_size.to_bytes(4, 'little'))
-    
-    return header.getvalue()
+    return _WAV_HEADER.pack(
+        b'RIFF', data_size + 36, b'WAVE',  # RIFF header (file size - 8)
+        b'fmt ', 16, 1, CHANNELS, SAMPLE_RATE,  # fmt chunk: size, PCM, channels, sample rate
+        SAMPLE_RATE * CHANNELS * BYTES_PER_SAMPLE,  # Byte rate
+        CHANNELS * BYTES_PER_SAMPLE,  # Block align
+        BYTES_PER_SAMPLE * 8,  # Bits per sample
+        b'data', data_size  # data chunk
+    )
 
 
 @app.post("/v1/audio/speech")
@@ -259,8 +369,6 @@ async def create_speech(request: SpeechRequest):
     This endpoint is compatible with the OpenAI TTS API format.
     Only the 'model' and 'input' parameters are used.
     """
-    import genie_tts as genie
-    
     # Validate model
     if request.model not in VOICES:
         return JSONResponse(
@@ -287,19 +395,30 @@ async def create_speech(request: SpeechRequest):
             }
         )
     
+    if len(request.input) > MAX_INPUT_CHARS:
+        return JSONResponse(
+            status_code=413,
+            content={
+                "error": {
+                    "message": f"Input text is too long ({len(request.input)} > {MAX_INPUT_CHARS} characters)",
+                    "type": "invalid_request_error",
+                    "code": "input_too_long"
+                }
+            }
+        )
+    
     try:
-        # Collect audio chunks
-        audio_chunks = []
-        
-        async for chunk in genie.tts_async(
+        audio_stream = genie.tts_async(
             character_name=request.model,
             text=request.input.strip(),
             play=False,
             split_sentence=True
-        ):
-            audio_chunks.append(chunk)
+        )
+        
+        # Wait for the first chunk so generation errors can still be reported as JSON
+        first_chunk = await anext(audio_stream, None)
         
-        if not audio_chunks:
+        if first_chunk is None:
             return JSONResponse(
                 status_code=500,
                 content={
@@ -311,15 +430,37 @@ async def create_speech(request: SpeechRequest):
                 }
             )
         
-        # Combine all chunks
-        audio_data = b''.join(audio_chunks)
+        if len(first_chunk) > MAX_AUDIO_BYTES:
+            await audio_stream.aclose()
+            await asyncio.to_thread(genie.stop)
+            return JSONResponse(
+                status_code=413,
+                content={
+                    "error": {
+                        "message": f"Generated audio exceeds {MAX_AUDIO_BYTES} bytes",
+                        "type": "invalid_request_error",
+                        "code": "audio_too_large"
+                    }
+                }
+            )
         
-        # Generate complete WAV file
-        wav_header = generate_wav_header(len(audio_data))
-        wav_content = wav_header + audio_data
+        async def stream_wav():
+            total_bytes = len(first_chunk)
+            # The total size is unknown while streaming, so use a placeholder header
+            yield generate_wav_header(STREAMING_DATA_SIZE)
+            yield first_chunk
+            async for chunk in audio_stream:
+                total_bytes += len(chunk)
+                if total_bytes > MAX_AUDIO_BYTES:
+                    # Headers are already sent, so the best we can do is end the stream early
+                    logger.warning(f"Generated audio exceeds {MAX_AUDIO_BYTES} bytes, truncating response")
+                    await audio_stream.aclose()
+                    await asyncio.to_thread(genie.stop)
+                    break
+                yield chunk
         
-        return Response(
-            content=wav_content,
+        return StreamingResponse(
+            stream_wav(),
             media_type="audio/wav",
             headers={
                 "Content-Disposition": "attachment; filename=speech.wav"
@@ -370,6 +511,14 @@ async def internal_error_handler(request: Request, exc: Exception):
 
 
 if __name__ == "__main__":
+    if "--warm-ort-cache" in sys.argv[1:]:
+        log_listener.start()
+        try:
+            exit_code = warm_ort_cache()
+        finally:
+            log_listener.stop()
+        sys.exit(exit_code)
+    
     import uvicorn
     
     port = int(os.environ.get("PORT", 7860))
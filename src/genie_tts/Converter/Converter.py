@@ -1,11 +1,49 @@
 from .v2.Converter import convert as convert_v2
 from .v2ProPlus.Converter import convert as convert_v2pp
 
+import logging
 import os
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# GPT-SoVITS 会把 SoVITS 权重文件的前 2 字节（原本为 b"PK"）改写为版本标识。
+HEAD_TO_VERSION: Dict[bytes, str] = {
+    b"00": "v1",
+    b"01": "v2",
+    b"02": "v3",
+    b"03": "v3",
+    b"04": "v4",
+    b"05": "v2Pro",
+    b"06": "v2ProPlus",
+}
+
+# (path, mtime, size) -> 模型版本
+_version_cache: Dict[Tuple[str, float, int], Optional[str]] = {}
+
+
+def detect_sovits_version(torch_pth_path: str) -> Optional[str]:
+    """
+    读取 SoVITS 权重文件头以判断模型版本，无版本标识（旧版权重）时返回 None。
+    """
+    stat = os.stat(torch_pth_path)
+    cache_key = (os.path.abspath(torch_pth_path), stat.st_mtime, stat.st_size)
+    if cache_key not in _version_cache:
+        with open(torch_pth_path, "rb") as f:
+            head = f.read(2)
+        _version_cache[cache_key] = HEAD_TO_VERSION.get(head)
+    return _version_cache[cache_key]
 
 
 def convert(torch_ckpt_path: str, torch_pth_path: str, output_dir: str) -> None:
-    if os.path.getsize(torch_pth_path) > 150 * 1024 * 1024:  # 大于 150 MB
+    version = detect_sovits_version(torch_pth_path)
+    if version not in ("v2", "v2ProPlus"):
+        if version is not None:
+            logger.warning(f"Unsupported SoVITS model version {version}, guessing the converter by file size.")
+        # 旧版权重没有版本标识，只能按文件大小判断。
+        version = "v2ProPlus" if os.path.getsize(torch_pth_path) > 150 * 1024 * 1024 else "v2"  # 大于 150 MB
+
+    if version == "v2ProPlus":
         convert_v2pp(torch_ckpt_path, torch_pth_path, output_dir)
     else:
         convert_v2(torch_ckpt_path, torch_pth_path, output_dir)
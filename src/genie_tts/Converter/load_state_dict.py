@@ -1,26 +1,55 @@
 import sys
 import os
+import inspect
 
 sys.path.append(os.path.dirname(__file__))
 
 import torch
-from io import BytesIO
+import io
 import utils
 
+# torch >= 2.1 支持 mmap 加载，权重按需从磁盘映射，转换时不必整份读入内存。
+_MMAP_KWARGS = {'mmap': True} if 'mmap' in inspect.signature(torch.load).parameters else {}
+
+
+class _PKHeaderReader(io.RawIOBase):
+    """只读文件包装：读取时把被改写为版本标识的前两个字节还原为 b"PK"，不复制整个文件。"""
+
+    def __init__(self, raw):
+        super().__init__()
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+    def readinto(self, b) -> int:
+        pos = self._raw.tell()
+        n = self._raw.readinto(b)
+        if pos < 2 and n:
+            end = min(2 - pos, n)
+            memoryview(b).cast('B')[:end] = b"PK"[pos:pos + end]
+        return n
+
 
 def load_sovits_model(pth_path: str, device: str = 'cpu'):
-    f = open(pth_path, "rb")
-    meta = f.read(2)
-    if meta != b"PK":
-        # noinspection PyTypeChecker
-        data = b"PK" + f.read()
-        bio = BytesIO()
-        # noinspection PyTypeChecker
-        bio.write(data)
-        bio.seek(0)
-        return torch.load(bio, map_location=device, weights_only=False)
-    return torch.load(pth_path, map_location=device, weights_only=False)
+    with open(pth_path, "rb") as f:
+        meta = f.read(2)
+        if meta != b"PK":
+            # 文件头被改写为版本标识，无法直接 mmap；通过包装在读取时还原文件头，按需读取而不整份读入内存。
+            f.seek(0)
+            return torch.load(_PKHeaderReader(f), map_location=device, weights_only=False)
+    # SoVITS 权重中包含 config 等非张量对象，不能使用 weights_only。
+    return torch.load(pth_path, map_location=device, weights_only=False, **_MMAP_KWARGS)
 
 
 def load_gpt_model(ckpt_path: str, device: str = 'cpu'):
-    return torch.load(ckpt_path, map_location=device, weights_only=True)
+    return torch.load(ckpt_path, map_location=device, weights_only=True, **_MMAP_KWARGS)
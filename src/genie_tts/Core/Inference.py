@@ -2,6 +2,7 @@ import onnxruntime as ort
 import numpy as np
 from typing import List, Optional
 import threading
+import weakref
 
 from ..Audio.ReferenceAudio import ReferenceAudio
 from ..GetPhonesAndBert import get_phones_and_bert
@@ -12,6 +13,8 @@ MAX_T2S_LEN = 1000
 class GENIE:
     def __init__(self):
         self.stop_event: threading.Event = threading.Event()
+        # 缓存每个 Stage Decoder 会话的输入名，避免每句都调用 get_inputs()
+        self._input_names: 'weakref.WeakKeyDictionary[ort.InferenceSession, List[str]]' = weakref.WeakKeyDictionary()
 
     def tts(
             self,
@@ -90,15 +93,15 @@ class GENIE:
         )
 
         # Stage Decoder
-        input_names: List[str] = [inp.name for inp in stage_decoder.get_inputs()]
+        input_names: Optional[List[str]] = self._input_names.get(stage_decoder)
+        if input_names is None:
+            input_names = [inp.name for inp in stage_decoder.get_inputs()]
+            self._input_names[stage_decoder] = input_names
         idx: int = 0
         for idx in range(0, 500):
             if self.stop_event.is_set():
                 return None
-            input_feed = {
-                name: data
-                for name, data in zip(input_names, [y, y_emb, *present_key_values])
-            }
+            input_feed = dict(zip(input_names, (y, y_emb, *present_key_values)))
             outputs = stage_decoder.run(None, input_feed)
             y, y_emb, stop_condition_tensor, *present_key_values = outputs
 
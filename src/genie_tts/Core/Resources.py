@@ -1,17 +1,29 @@
 import os
 from huggingface_hub import snapshot_download
 
+from ..Utils.Utils import get_download_lock
+
 
 def download_genie_data() -> None:
-    print(f"🚀 Starting download Genie-TTS resources… This may take a few moments. ⏳")
-    snapshot_download(
-        repo_id="High-Logic/Genie",
-        repo_type="model",
-        allow_patterns="GenieData/*",
-        local_dir=".",
-        local_dir_use_symlinks=True,  # 软链接
-    )
-    print("✅ Genie-TTS resources downloaded successfully.")
+    with get_download_lock("High-Logic/Genie"):
+        print(f"🚀 Starting download Genie-TTS resources… This may take a few moments. ⏳")
+        snapshot_download(
+            repo_id="High-Logic/Genie",
+            repo_type="model",
+            allow_patterns="GenieData/*",
+            local_dir=".",
+            local_dir_use_symlinks=True,  # 软链接
+        )
+        print("✅ Genie-TTS resources downloaded successfully.")
+
+
+def prefer_int8_model(model_path: str) -> str:
+    """
+    如果同目录下存在 int8 量化版本（例如 model.int8.onnx），则优先使用该模型。
+    """
+    root, ext = os.path.splitext(model_path)
+    int8_path = f"{root}.int8{ext}"
+    return int8_path if os.path.exists(int8_path) else model_path
 
 
 def ensure_exists(path: str, name: str):
@@ -19,7 +31,8 @@ def ensure_exists(path: str, name: str):
         raise FileNotFoundError(
             f"Required directory or file '{name}' was not found at: {path}\n"
             f"Please download the pretrained models and place them under './GenieData', "
-            f"or set the environment variable GENIE_DATA_DIR to the correct directory."
+            f"or set the environment variable GENIE_DATA_DIR to the correct directory. "
+            f"Set GENIE_AUTO_DOWNLOAD=1 to download them automatically from HuggingFace."
         )
 
 
@@ -66,11 +79,8 @@ ROBERTA_MODEL_DIR: str = os.getenv(
 
 if not os.path.exists(GENIE_DATA_DIR):
     print("⚠️ GenieData folder not found.")
-    choice = input("Would you like to download it automatically from HuggingFace? (y/N): ").strip().lower()
-    if choice == "y":
+    # 不再通过 input() 询问用户，避免在无交互环境（服务器、容器）中阻塞。
+    if os.getenv("GENIE_AUTO_DOWNLOAD") == "1":
         download_genie_data()
 
-# ---- Run directory checks ----
-ensure_exists(HUBERT_MODEL_DIR, "HUBERT_MODEL_DIR")
-ensure_exists(SV_MODEL, "SV_MODEL")
-# ensure_exists(ROBERTA_MODEL_DIR, "ROBERTA_MODEL_DIR")
+# 目录检查在实际加载对应模型时进行（见 ModelManager），导入时不再逐一检查。
@@ -2,19 +2,18 @@
 """
 用于纯日语的 G2P。
 """
+import os
 import re
+from functools import lru_cache
 import pyopenjtalk
-from typing import List
-from ..SymbolsV2 import symbols_v2, symbol_to_id_v2
+from typing import List, Pattern, Tuple
+from ..SymbolsV2 import symbol_to_id_v2
 
 # 匹配连续的标点符号
 _CONSECUTIVE_PUNCTUATION_RE = re.compile(r"([,./?!~…・])\1+")
 
-# 匹配需要转换为日语读法的特殊符号
-_SYMBOLS_TO_JAPANESE = [
-    (re.compile("%"), "パーセント"),
-    (re.compile("％"), "パーセント"),
-]
+# 匹配需要转换为日语读法的特殊符号（目前只有半角/全角百分号）
+_PERCENT_RE = re.compile("[%％]")
 
 # 匹配日语字符（汉字、假名、全角字母数字等）
 _JAPANESE_CHARACTERS_RE = re.compile(
@@ -26,6 +25,25 @@ _JAPANESE_MARKS_RE = re.compile(
     r"[^A-Za-z\d\u3005\u3040-\u30ff\u4e00-\u9fff\uff11-\uff19\uff21-\uff3a\uff41-\uff5a\uff66-\uff9d]"
 )
 
+# 从 OpenJTalk 标签中提取韵律特征
+_P3_RE = re.compile(r"-(.*?)\+")
+_A1_RE = re.compile(r"/A:([0-9\-]+)\+")
+_A2_RE = re.compile(r"\+(\d+)\+")
+_A3_RE = re.compile(r"\+(\d+)/")
+_F1_RE = re.compile(r"/F:(\d+)_")
+_E3_RE = re.compile(r"!(\d+)_")
+# 一次性提取普通音素标签的 p3, a1, a2, a3, f1（标签格式：p1^p2-p3+p4=p5/A:a1+a2+a3/.../F:f1_...）
+_LABEL_RE = re.compile(
+    r"[^-]*-(?P<p3>[^+]*)\+[^/]*/A:(?P<a1>[0-9\-]+)\+(?P<a2>\d+)\+(?P<a3>\d+)/.*?/F:(?P<f1>\d+)_"
+)
+
+# 音素及标点的后处理替换表
+_POST_REPLACE_MAP = {
+    "：": ",", "；": ",", "，": ",", "。": ".",
+    "！": "!", "？": "?", "\n": ".", "·": ",",
+    "、": ",", "...": "…",
+}
+
 
 class JapaneseG2P:
     """
@@ -38,35 +56,45 @@ class JapaneseG2P:
     @staticmethod
     def _text_normalize(text: str) -> str:
         """对输入文本进行基础的规范化处理。"""
-        for regex, replacement in _SYMBOLS_TO_JAPANESE:
-            text = re.sub(regex, replacement, text)
-        text = _CONSECUTIVE_PUNCTUATION_RE.sub(r"\1", text)
-        text = text.lower()
-        return text
+        # 替换规则均不涉及字母，因此可以先转为小写。
+        text = _PERCENT_RE.sub("パーセント", text.lower())
+        return _CONSECUTIVE_PUNCTUATION_RE.sub(r"\1", text)
 
     @staticmethod
     def _post_replace_phoneme(ph: str) -> str:
         """对单个音素或标点进行后处理替换。"""
-        rep_map = {
-            "：": ",", "；": ",", "，": ",", "。": ".",
-            "！": "!", "？": "?", "\n": ".", "·": ",",
-            "、": ",", "...": "…",
-        }
-        return rep_map.get(ph, ph)
+        return _POST_REPLACE_MAP.get(ph, ph)
 
     @staticmethod
-    def _numeric_feature_by_regex(regex: str, s: str) -> int:
+    def _numeric_feature_by_regex(regex: Pattern[str], s: str) -> int:
         """从OpenJTalk标签中提取数值特征。"""
-        match = re.search(regex, s)
+        match = regex.search(s)
         return int(match.group(1)) if match else -50
 
+    @staticmethod
+    def _label_features(lab: str) -> Tuple[str, int, int, int, int]:
+        """从OpenJTalk标签中提取 (p3, a1, a2, a3, f1)。"""
+        match = _LABEL_RE.match(lab)
+        if match:
+            return (match.group("p3"), int(match.group("a1")), int(match.group("a2")),
+                    int(match.group("a3")), int(match.group("f1")))
+        # 含 xx 等缺失字段的标签（sil、pau 等），逐项匹配，缺失的特征记为 -50。
+        p3 = _P3_RE.search(lab)
+        return (
+            p3.group(1) if p3 else "",
+            JapaneseG2P._numeric_feature_by_regex(_A1_RE, lab),
+            JapaneseG2P._numeric_feature_by_regex(_A2_RE, lab),
+            JapaneseG2P._numeric_feature_by_regex(_A3_RE, lab),
+            JapaneseG2P._numeric_feature_by_regex(_F1_RE, lab),
+        )
+
     @staticmethod
     def _pyopenjtalk_g2p_prosody(text: str) -> List[str]:
         """使用pyopenjtalk提取音素及韵律符号。"""
         labels = pyopenjtalk.make_label(pyopenjtalk.run_frontend(text))
+        features = [JapaneseG2P._label_features(lab) for lab in labels]
         phones = []
-        for n, lab_curr in enumerate(labels):
-            p3 = re.search(r"-(.*?)\+", lab_curr).group(1)
+        for n, (p3, a1, a2, a3, f1) in enumerate(features):
             if p3 in "AEIOU":
                 p3 = p3.lower()
 
@@ -74,7 +102,7 @@ class JapaneseG2P:
                 if n == 0:
                     phones.append("^")
                 elif n == len(labels) - 1:
-                    e3 = JapaneseG2P._numeric_feature_by_regex(r"!(\d+)_", lab_curr)
+                    e3 = JapaneseG2P._numeric_feature_by_regex(_E3_RE, labels[n])
                     phones.append("?" if e3 == 1 else "$")
                 continue
             elif p3 == "pau":
@@ -83,12 +111,7 @@ class JapaneseG2P:
             else:
                 phones.append(p3)
 
-            a1 = JapaneseG2P._numeric_feature_by_regex(r"/A:([0-9\-]+)\+", lab_curr)
-            a2 = JapaneseG2P._numeric_feature_by_regex(r"\+(\d+)\+", lab_curr)
-            a3 = JapaneseG2P._numeric_feature_by_regex(r"\+(\d+)/", lab_curr)
-            f1 = JapaneseG2P._numeric_feature_by_regex(r"/F:(\d+)_", lab_curr)
-            lab_next = labels[n + 1] if n + 1 < len(labels) else ""
-            a2_next = JapaneseG2P._numeric_feature_by_regex(r"\+(\d+)\+", lab_next)
+            a2_next = features[n + 1][2] if n + 1 < len(features) else -50
 
             if a3 == 1 and a2_next == 1 and p3 in "aeiouAEIOUNcl":
                 phones.append("#")
@@ -142,9 +165,14 @@ class JapaneseG2P:
         return processed_phonemes
 
 
-def japanese_to_phones(text: str) -> List[int]:
+@lru_cache(maxsize=int(os.getenv('MAX_PHONEME_CACHE', '4096')))
+def _japanese_to_phones_cached(text: str) -> Tuple[int, ...]:
     phones = JapaneseG2P.g2p(text)
-    phones = [ph for ph in phones if ph in symbols_v2]
-    # print(phones)
-    phones = [symbol_to_id_v2[ph] for ph in phones]
-    return phones
+    # 单次遍历：不在符号表中的音素直接丢弃
+    get_id = symbol_to_id_v2.get
+    return tuple(i for i in map(get_id, phones) if i is not None)
+
+
+def japanese_to_phones(text: str) -> List[int]:
+    # 首尾空白不影响 G2P 结果，去除后再作为缓存 key。
+    return list(_japanese_to_phones_cached(text.strip()))
@@ -95,6 +95,7 @@ def load_character(
         character_name: str,
         onnx_model_dir: Union[str, PathLike],
         language: str,
+        optimized_model_dir: Union[str, PathLike, None] = None,
 ) -> None:
     """
     Loads a character model from an ONNX model directory.
@@ -103,6 +104,9 @@ def load_character(
         character_name (str): The name to assign to the loaded character.
         onnx_model_dir (str | PathLike): The directory path containing the ONNX model files.
         language (str): The language of the character model.
+        optimized_model_dir (str | PathLike | None, optional): If provided, ONNX Runtime's optimized models are
+            saved to this directory on the first load and reused on later loads to skip graph optimization.
+            Defaults to None.
     """
     check_onnx_model_dir(onnx_model_dir)
 
@@ -119,11 +123,14 @@ def load_character(
         ensure_exists(English_G2P_DIR, "English_G2P_DIR")
 
     model_path: str = os.fspath(onnx_model_dir)
-    model_manager.load_character(
+    loaded = model_manager.load_character(
         character_name=character_name,
         model_dir=model_path,
         language=language,
+        optimized_model_dir=os.fspath(optimized_model_dir) if optimized_model_dir else None,
     )
+    if not loaded:
+        raise RuntimeError(f"Failed to load character '{character_name}' from {model_path}")
 
 
 def unload_character(
@@ -7,6 +7,7 @@
 import gc
 import logging
 import os
+import threading
 from dataclasses import dataclass
 from typing import Optional, List, Dict
 
@@ -16,7 +17,7 @@ import onnxruntime
 from onnxruntime import InferenceSession
 from tokenizers import Tokenizer
 
-from .Core.Resources import (HUBERT_MODEL_DIR, SV_MODEL, ROBERTA_MODEL_DIR)
+from .Core.Resources import (HUBERT_MODEL_DIR, SV_MODEL, ROBERTA_MODEL_DIR, prefer_int8_model, ensure_exists)
 from .Utils.Utils import LRUCacheDict
 
 onnxruntime.set_default_logger_severity(3)
@@ -114,6 +115,26 @@ def load_session_with_fp16_conversion(
         raise e
 
 
+def is_optimized_model_fresh(optimized_path: str, *source_paths: Optional[str]) -> bool:
+    """
+    判断已序列化的优化模型是否比源文件（ONNX 与 FP16 权重）更新。
+    """
+    if not os.path.exists(optimized_path):
+        return False
+    optimized_mtime = os.path.getmtime(optimized_path)
+    return all(
+        os.path.getmtime(p) <= optimized_mtime
+        for p in source_paths if p and os.path.exists(p)
+    )
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
 class ModelManager:
     def __init__(self):
         capacity_str = os.getenv('Max_Cached_Character_Models', '3')
@@ -122,6 +143,8 @@ class ModelManager:
         )
         self.character_to_language: Dict[str, str] = {}
         self.character_model_paths: Dict[str, str] = {}
+        self.character_optimized_dirs: Dict[str, Optional[str]] = {}
+        self._register_lock: threading.Lock = threading.Lock()  # 允许多线程并行加载角色
         self.providers = ["CPUExecutionProvider"]
 
         self.cn_hubert: Optional[InferenceSession] = None
@@ -135,6 +158,7 @@ class ModelManager:
         if not os.path.exists(model_path):
             # logger.warning(f'RoBERTa model does not exist: {model_path}. BERT features will not be used.')
             return False
+        model_path = prefer_int8_model(model_path)
         try:
             self.roberta_model = onnxruntime.InferenceSession(
                 model_path,
@@ -155,6 +179,8 @@ class ModelManager:
     def load_sv_model(self, model_path: str = SV_MODEL) -> bool:
         if self.speaker_verification_model is not None:
             return True
+        ensure_exists(model_path, "SV_MODEL")
+        model_path = prefer_int8_model(model_path)
         try:
             self.speaker_verification_model = onnxruntime.InferenceSession(
                 model_path,
@@ -172,8 +198,10 @@ class ModelManager:
     def load_cn_hubert(self, model_path: str = GSVModelFile.HUBERT_MODEL) -> bool:
         if self.cn_hubert is not None:
             return True
+        ensure_exists(HUBERT_MODEL_DIR, "HUBERT_MODEL_DIR")
+        model_path = prefer_int8_model(model_path)
         try:
-            # Hubert 也应用内存转换逻辑
+            # Hubert 也应用内存转换逻辑（int8 量化模型不需要）
             if model_path == GSVModelFile.HUBERT_MODEL and os.path.exists(GSVModelFile.HUBERT_MODEL_WEIGHT_FP16):
                 self.cn_hubert = load_session_with_fp16_conversion(
                     model_path,
@@ -217,7 +245,9 @@ class ModelManager:
             )
         if character_name in self.character_model_paths:
             model_dir = self.character_model_paths[character_name]
-            if self.load_character(character_name, model_dir, language=language):
+            optimized_model_dir = self.character_optimized_dirs.get(character_name)
+            if self.load_character(character_name, model_dir, language=language,
+                                   optimized_model_dir=optimized_model_dir):
                 return self.get(character_name)
             else:
                 del self.character_model_paths[character_name]
@@ -233,9 +263,13 @@ class ModelManager:
             character_name: str,
             model_dir: str,
             language: str,
+            optimized_model_dir: Optional[str] = None,
     ) -> bool:
         """
         加载角色模型，如果需要，在内存中动态转换 FP16 权重。
+
+        若指定 optimized_model_dir，首次加载时会将 ORT 图优化后的模型序列化到该目录，
+        之后的加载直接读取优化后的模型，跳过图优化。
         """
         character_name = character_name.lower()
         if character_name in self.character_to_model:
@@ -262,28 +296,20 @@ class ModelManager:
         fp32_decoders = [GSVModelFile.T2S_FIRST_STAGE_DECODER_FP32, GSVModelFile.T2S_STAGE_DECODER_FP32]
         model_files_to_load.extend(fp32_decoders)
 
+        # 优化后的模型与 ORT 版本相关，按版本分目录存放，升级 onnxruntime 后自动重新生成
+        cache_dir = (
+            os.path.join(optimized_model_dir, f"ort-{onnxruntime.__version__}") if optimized_model_dir else None
+        )
+
         try:
             for model_file in model_files_to_load:
                 model_path = os.path.normpath(os.path.join(model_dir, model_file))
 
-                # 设置 Session Options
-                sess_options = onnxruntime.SessionOptions()
-                sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
-
                 if os.path.exists(model_path):
                     fp16_bin_name = onnx_to_fp16_map.get(model_file)
                     fp16_bin_path = os.path.join(model_dir, fp16_bin_name) if fp16_bin_name else None
-
-                    if fp16_bin_path and os.path.exists(fp16_bin_path):
-                        model_dict[model_file] = load_session_with_fp16_conversion(
-                            model_path, fp16_bin_path, self.providers, sess_options
-                        )
-                    else:
-                        model_dict[model_file] = onnxruntime.InferenceSession(
-                            model_path,
-                            providers=self.providers,
-                            sess_options=sess_options,
-                        )
+                    optimized_path = os.path.join(cache_dir, model_file) if cache_dir else None
+                    model_dict[model_file] = self._load_session(model_path, fp16_bin_path, optimized_path)
                 elif model_file == GSVModelFile.PROMPT_ENCODER:
                     model_dict[model_file] = None
                 else:
@@ -297,9 +323,11 @@ class ModelManager:
                 f"- Model Type: {'V2ProPlus' if is_v2pp else 'V2'}"
             )
 
-            self.character_to_model[character_name] = model_dict
-            self.character_to_language[character_name] = language
-            self.character_model_paths[character_name] = model_dir
+            with self._register_lock:
+                self.character_to_model[character_name] = model_dict
+                self.character_to_language[character_name] = language
+                self.character_model_paths[character_name] = model_dir
+                self.character_optimized_dirs[character_name] = optimized_model_dir
             return True
 
         except Exception as e:
@@ -309,6 +337,78 @@ class ModelManager:
             )
             return False
 
+    def _load_session(
+            self,
+            model_path: str,
+            fp16_bin_path: Optional[str],
+            optimized_path: Optional[str],
+    ) -> InferenceSession:
+        """
+        创建模型的 InferenceSession，指定 optimized_path 时读取或生成优化模型缓存。
+
+        缓存只保存 ORT_ENABLE_EXTENDED 级别的优化结果，与硬件无关，可以随镜像分发；
+        与硬件相关的布局优化在每次加载时由 ORT_ENABLE_ALL 完成。
+        """
+        # 注：导出的模型 batch 维度已固定为 1；其余动态维度均为序列长度且模型没有 padding mask，
+        # 因此不使用 add_free_dimension_override_by_name 进行分桶（填充会改变推理结果）。
+        sess_options = onnxruntime.SessionOptions()
+        sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        if optimized_path and is_optimized_model_fresh(optimized_path, model_path, fp16_bin_path):
+            # 已有优化后的模型，跳过耗时的 EXTENDED 级别图融合
+            try:
+                return onnxruntime.InferenceSession(
+                    optimized_path,
+                    providers=self.providers,
+                    sess_options=sess_options,
+                )
+            except Exception as e:
+                # 缓存文件损坏或不兼容：删除后按正常流程重新优化
+                logger.warning(f"Discarding unusable optimized model '{optimized_path}': {e}")
+                _remove_quietly(optimized_path)
+                sess_options = onnxruntime.SessionOptions()
+                sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        if not optimized_path:
+            return self._create_session(model_path, fp16_bin_path, sess_options)
+
+        # 先写入临时文件再原子替换，进程中途退出也不会留下残缺的缓存文件
+        tmp_path = f"{optimized_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(optimized_path), exist_ok=True)
+            save_options = onnxruntime.SessionOptions()
+            save_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+            save_options.optimized_model_filepath = tmp_path
+            session = self._create_session(model_path, fp16_bin_path, save_options)
+            os.replace(tmp_path, optimized_path)
+        except Exception as e:
+            # 缓存目录不可写或序列化失败（如磁盘已满）时不影响加载，退回普通 Session
+            logger.warning(f"Failed to save optimized model '{optimized_path}': {e}")
+            _remove_quietly(tmp_path)
+            return self._create_session(model_path, fp16_bin_path, sess_options)
+
+        # 保存用的 Session 只做了 EXTENDED 级别优化，从缓存重新加载以应用完整优化
+        try:
+            return onnxruntime.InferenceSession(optimized_path, providers=self.providers, sess_options=sess_options)
+        except Exception as e:
+            logger.warning(f"Discarding unusable optimized model '{optimized_path}': {e}")
+            _remove_quietly(optimized_path)
+            return session
+
+    def _create_session(
+            self,
+            model_path: str,
+            fp16_bin_path: Optional[str],
+            sess_options: onnxruntime.SessionOptions,
+    ) -> InferenceSession:
+        if fp16_bin_path and os.path.exists(fp16_bin_path):
+            return load_session_with_fp16_conversion(model_path, fp16_bin_path, self.providers, sess_options)
+        return onnxruntime.InferenceSession(
+            model_path,
+            providers=self.providers,
+            sess_options=sess_options,
+        )
+
     def remove_all_character(self) -> None:
         self.character_to_model.clear()
         gc.collect()
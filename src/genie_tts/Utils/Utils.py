@@ -1,5 +1,10 @@
 from collections import OrderedDict
+from typing import Dict
 import queue
+import threading
+
+_download_locks: Dict[str, threading.Lock] = {}
+_download_locks_guard: threading.Lock = threading.Lock()
 
 
 class LRUCacheDict(OrderedDict):
@@ -26,3 +31,11 @@ def clear_queue(q: queue.Queue) -> None:
             q.get_nowait()
         except queue.Empty:
             break
+
+
+def get_download_lock(repo_id: str) -> threading.Lock:
+    """返回指定 HuggingFace 仓库的下载锁，避免多个线程同时下载同一仓库。"""
+    with _download_locks_guard:
+        if repo_id not in _download_locks:
+            _download_locks[repo_id] = threading.Lock()
+        return _download_locks[repo_id]
@@ -1,6 +1,7 @@
 """配置管理模块"""
 
 import os
+from functools import cached_property
 from typing import List, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -24,6 +25,7 @@ class Settings(BaseSettings):
     tts_max_concurrent_per_endpoint: int = Field(default=3, description="每个端点最大并发数")
     tts_request_timeout: int = Field(default=60, description="TTS 请求超时时间（秒）")
     tts_retry_count: int = Field(default=2, description="TTS 请求重试次数")
+    tts_retry_jitter: float = Field(default=0.2, description="TTS 重试退避的随机抖动比例")
     
     # 缓存配置
     cache_max_size: int = Field(default=1000, description="缓存最大条目数")
@@ -37,9 +39,9 @@ class Settings(BaseSettings):
     # 日志配置
     log_level: str = Field(default="INFO", description="日志级别")
     
-    @property
+    @cached_property
     def tts_endpoint_list(self) -> List[str]:
-        """解析 TTS 端点列表"""
+        """解析 TTS 端点列表（仅在首次访问时解析）"""
         return [ep.strip() for ep in self.tts_endpoints.split(",") if ep.strip()]
     
     class Config:
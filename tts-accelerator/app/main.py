@@ -48,6 +48,7 @@ async def lifespan(app: FastAPI):
         max_concurrent_per_endpoint=settings.tts_max_concurrent_per_endpoint,
         request_timeout=settings.tts_request_timeout,
         retry_count=settings.tts_retry_count,
+        retry_jitter=settings.tts_retry_jitter,
     )
     await tts_balancer.initialize()
     app.state.tts_balancer = tts_balancer
@@ -186,6 +187,9 @@ async def internal_error_handler(request: Request, exc):
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     settings = get_settings()
-    uvicorn.run(app, host=settings.host, port=settings.port)
\ No newline at end of file
+    # uvloop 由 uvicorn[standard] 提供，不支持 Windows
+    loop = "asyncio" if sys.platform == "win32" else "uvloop"
+    uvicorn.run(app, host=settings.host, port=settings.port, loop=loop)
\ No newline at end of file
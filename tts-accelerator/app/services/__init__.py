@@ -2,7 +2,7 @@
 
 from .text_splitter import StreamingTextSplitter
 from .tts_cache import TTSCacheManager, TTSCacheEntry, CacheStatus
-from .tts_balancer import TTSLoadBalancer, TTSEndpoint
+from .tts_balancer import TTSLoadBalancer, TTSEndpoint, TTSRequestError
 from .proxy_client import ProxyClient
 
 __all__ = [
@@ -12,5 +12,6 @@ __all__ = [
     "CacheStatus",
     "TTSLoadBalancer",
     "TTSEndpoint",
+    "TTSRequestError",
     "ProxyClient",
 ]
\ No newline at end of file
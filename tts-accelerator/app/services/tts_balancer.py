@@ -1,53 +1,113 @@
 """TTS 负载均衡器 - 支持多 HuggingFace Space 并行请求"""
 
 import asyncio
+import hashlib
+import random
 import time
 import logging
-from typing import List, Optional, Dict
+import operator
+from typing import Collection, List, Optional, Dict, Set, Tuple
 from dataclasses import dataclass, field
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# 健康检查只需确认端点存活，连接阶段不必等待完整的读取超时
+HEALTH_CHECK_TIMEOUT = httpx.Timeout(10, connect=2)
 
-@dataclass
+# TTS 请求的固定请求头
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# 流式读取 TTS 响应时的块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 端点熔断后的冷却时间（秒）
+ENDPOINT_COOLDOWN = 30.0
+
+# 所有端点都不可用时，两次全局重置之间的最小间隔（秒）
+GLOBAL_RESET_INTERVAL = 10.0
+
+# get_stats 结果的缓存时间（秒）
+STATS_TTL = 1.0
+
+# 响应时间 EWMA 的平滑系数
+EWMA_ALPHA = 0.2
+
+
+class TTSRequestError(Exception):
+    """
+    TTS 请求失败。
+    
+    kind 取值：http（上游返回错误状态码）、timeout（请求超时）、other（其他错误）、
+    unavailable（没有可用端点）、exhausted（重试次数用尽）。
+    """
+    __slots__ = ("kind", "url", "status")
+    
+    def __init__(self, kind: str, message: str, url: str = "", status: Optional[int] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.url = url
+        self.status = status
+
+
+@dataclass(eq=False, slots=True)
 class TTSEndpoint:
-    """TTS 服务端点"""
+    """TTS 服务端点（按对象身份哈希，可放入集合）"""
     url: str
     is_available: bool = True
     current_load: int = 0
     last_request_time: float = 0
     error_count: int = 0
     total_requests: int = 0
-    total_response_time: float = 0
-    
-    @property
-    def avg_response_time(self) -> float:
-        """平均响应时间"""
-        if self.total_requests == 0:
-            return 0
-        return self.total_response_time / self.total_requests
+    # 熔断冷却结束时间（time.monotonic），到期后自动恢复为可用
+    cooldown_until: float = 0
+    # 控制该端点并发数的信号量，由负载均衡器创建
+    semaphore: Optional[asyncio.Semaphore] = field(default=None, repr=False)
+    # 响应时间的指数加权移动平均，近期样本权重更高，能较快反映 Space 变慢
+    ewma_response_time: float = 0
     
     def record_success(self, response_time: float):
         """记录成功请求"""
+        if self.total_requests:
+            self.ewma_response_time = (
+                EWMA_ALPHA * response_time + (1 - EWMA_ALPHA) * self.ewma_response_time
+            )
+        else:
+            self.ewma_response_time = response_time
         self.total_requests += 1
-        self.total_response_time += response_time
         self.error_count = 0  # 重置连续错误计数
         self.is_available = True
     
     def record_failure(self):
         """记录失败请求"""
         self.error_count += 1
-        # 连续 3 次失败后标记为不可用
+        # 连续 3 次失败后标记为不可用，冷却期内不再分配请求
         if self.error_count >= 3:
             self.is_available = False
-            logger.warning(f"Endpoint {self.url} marked as unavailable after {self.error_count} consecutive errors")
+            self.cooldown_until = time.monotonic() + ENDPOINT_COOLDOWN
+            logger.warning(
+                f"Endpoint {self.url} marked as unavailable for {ENDPOINT_COOLDOWN:.0f}s "
+                f"after {self.error_count} consecutive errors"
+            )
+
+
+@dataclass(eq=False, slots=True)
+class _InflightRequest:
+    """合并后的上游请求及其等待方数量"""
+    task: asyncio.Task
+    waiters: int = 0
+
+
+# 端点选择的排序键：(当前负载, 响应时间 EWMA)，attrgetter 在 C 层构造元组
+_endpoint_load_key = operator.attrgetter("current_load", "ewma_response_time")
 
 
 class TTSLoadBalancer:
     """
     TTS 负载均衡器
     
+    相同文本优先发往固定端点（有界负载哈希），满载或不可用时
     使用最少连接算法将请求分发到多个 HuggingFace Space，
     支持并发控制、失败重试和健康检查。
     """
@@ -58,6 +118,7 @@ class TTSLoadBalancer:
         max_concurrent_per_endpoint: int = 3,
         request_timeout: int = 60,
         retry_count: int = 2,
+        retry_jitter: float = 0.2,
     ):
         """
         初始化负载均衡器。
@@ -66,34 +127,57 @@ class TTSLoadBalancer:
         :param max_concurrent_per_endpoint: 每个端点最大并发数
         :param request_timeout: 请求超时时间（秒）
         :param retry_count: 失败重试次数
+        :param retry_jitter: 重试退避时间的随机抖动比例（0.2 表示 ±20%）
         """
         self.endpoints: List[TTSEndpoint] = [
-            TTSEndpoint(url=url.rstrip('/')) for url in endpoints
+            TTSEndpoint(
+                url=url.rstrip('/'),
+                semaphore=asyncio.Semaphore(max_concurrent_per_endpoint),
+            )
+            for url in endpoints
         ]
         self.max_concurrent = max_concurrent_per_endpoint
         self.request_timeout = request_timeout
         self.retry_count = retry_count
-        
-        # 每个端点的信号量，控制并发
-        self.semaphores: Dict[str, asyncio.Semaphore] = {
-            ep.url: asyncio.Semaphore(max_concurrent_per_endpoint)
-            for ep in self.endpoints
-        }
+        self.retry_jitter = retry_jitter
         
         # HTTP 客户端
         self.client: Optional[httpx.AsyncClient] = None
         
+        # 上次重置所有端点状态的时间（time.monotonic）
+        self._last_reset: float = 0.0
+        
+        # 当前没有进行中请求的可用端点，低负载时可直接从中选取
+        self._idle: Set[TTSEndpoint] = set(self.endpoints)
+        
+        # 正在进行中的请求，(text, model) -> 共享的上游请求
+        self._inflight: Dict[Tuple[str, str], _InflightRequest] = {}
+        
         # 统计信息
+        # 这些计数器（以及 TTSEndpoint 上的计数）只在事件循环线程中修改和读取，
+        # 普通 int 的 += 不会被其他协程打断，无需加锁或原子计数器。
+        # 若将来在其他线程中读取，应通过 loop.call_soon_threadsafe 在事件循环内取快照。
         self.total_requests = 0
         self.successful_requests = 0
         self.failed_requests = 0
+        self.deduplicated_requests = 0
+        
+        # get_stats 的缓存：(生成时间, 统计结果)
+        self._stats_cache: Tuple[float, Optional[Dict]] = (0.0, None)
     
     async def initialize(self):
         """初始化 HTTP 客户端"""
         if self.client is None:
+            # 所有端点的满载并发都能复用长连接；HF Space 支持 HTTP/2，可在同一连接上多路复用
+            keepalive = max(32, len(self.endpoints) * self.max_concurrent)
             self.client = httpx.AsyncClient(
                 timeout=httpx.Timeout(self.request_timeout),
                 follow_redirects=True,
+                http2=True,
+                limits=httpx.Limits(
+                    max_keepalive_connections=keepalive,
+                    max_connections=max(256, keepalive),
+                ),
             )
     
     async def close(self):
@@ -102,62 +186,164 @@ class TTSLoadBalancer:
             await self.client.aclose()
             self.client = None
     
-    def _select_endpoint(self) -> Optional[TTSEndpoint]:
+    def _hash_select(self, text: str, model: str) -> Optional[TTSEndpoint]:
+        """
+        按 (text, model) 的哈希选择固定端点，使相同请求落在同一个 Space 上，便于利用其内部缓存。
+        
+        :return: 哈希对应的端点；端点不可用或已满载时返回 None，由调用方回退到最少连接选择
+        """
+        if not self.endpoints:
+            return None
+        digest = hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=8).digest()
+        ep = self.endpoints[int.from_bytes(digest, "little") % len(self.endpoints)]
+        if not ep.is_available or ep.current_load >= self.max_concurrent:
+            return None
+        return ep
+    
+    def _select_endpoint(self, exclude: Collection[TTSEndpoint] = ()) -> Optional[TTSEndpoint]:
         """
         选择最优端点（最少连接算法）。
         
+        :param exclude: 本次请求已失败过的端点，只有在没有其他可用端点时才会再次选中
         :return: 选中的端点，如果没有可用端点则返回 None
         """
-        available = [ep for ep in self.endpoints if ep.is_available]
+        # 快速路径：存在空闲端点时直接返回，无需遍历比较
+        while self._idle:
+            ep = next((e for e in self._idle if e not in exclude), None)
+            if ep is None:
+                break
+            if ep.is_available and ep.current_load == 0:
+                return ep
+            self._idle.discard(ep)
         
-        if not available:
-            # 如果所有端点都不可用，尝试重置状态
+        # 冷却期已过的端点自动恢复（半开状态：再失败一次即重新熔断）
+        now = time.monotonic()
+        for ep in self.endpoints:
+            if not ep.is_available and ep.cooldown_until <= now:
+                ep.is_available = True
+                ep.error_count = 2
+                if ep.current_load == 0:
+                    self._idle.add(ep)
+        
+        # 端点数量很少（通常 2~10 个），且 is_available / 平均响应时间会在请求和健康检查中被直接修改，
+        # 维护堆索引的代价反而更高；这里单次遍历取最小值，不分配列表也不排序。
+        best = min(
+            (ep for ep in self.endpoints if ep.is_available and ep not in exclude),
+            key=_endpoint_load_key,
+            default=None,
+        )
+        if best is None and exclude:
+            # 其余端点均不可用时，仍允许重试已失败过的端点
+            best = min(
+                (ep for ep in self.endpoints if ep.is_available),
+                key=_endpoint_load_key,
+                default=None,
+            )
+        
+        if best is None and self.endpoints:
+            # 如果所有端点都不可用，尝试重置状态；重置有最小间隔，期间直接报告无可用端点，
+            # 避免上游整体故障时每次请求都重置错误计数、引发重试风暴
+            if now - self._last_reset < GLOBAL_RESET_INTERVAL:
+                return None
+            self._last_reset = now
             logger.warning("All endpoints unavailable, attempting reset")
             for ep in self.endpoints:
                 ep.is_available = True
                 ep.error_count = 0
-            available = self.endpoints
+                ep.cooldown_until = 0
+                if ep.current_load == 0:
+                    self._idle.add(ep)
+            best = min(self.endpoints, key=_endpoint_load_key)
         
-        # 按当前负载排序，选择负载最小的
-        available.sort(key=lambda ep: (ep.current_load, ep.avg_response_time))
-        return available[0] if available else None
+        return best
     
     async def request(self, text: str, model: str) -> bytes:
         """
         发送 TTS 请求到最优端点。
         
+        相同 (text, model) 的并发请求会合并为一次上游调用，共享同一结果。
+        
+        :param text: 要合成的文本
+        :param model: TTS 模型名称
+        :return: WAV 音频数据
+        :raises TTSRequestError: 没有可用端点或所有重试都失败
+        """
+        key = (text, model)
+        # 事件循环单线程执行，查询与登记之间没有 await，无需加锁
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            # 上游请求在独立的 Task 中执行，不随任何一个调用方的取消而取消
+            inflight = _InflightRequest(asyncio.create_task(self._request(text, model)))
+            self._inflight[key] = inflight
+            inflight.task.add_done_callback(lambda task: self._forget_inflight(key, inflight))
+        else:
+            self.deduplicated_requests += 1
+        
+        inflight.waiters += 1
+        try:
+            # shield: 调用方被取消时只退出等待，共享的 Task 继续为其他等待方执行
+            return await asyncio.shield(inflight.task)
+        finally:
+            inflight.waiters -= 1
+            if inflight.waiters == 0 and not inflight.task.done():
+                # 已没有等待方，取消上游请求
+                inflight.task.cancel()
+                self._forget_inflight(key, inflight)
+    
+    def _forget_inflight(self, key: Tuple[str, str], inflight: "_InflightRequest"):
+        """请求结束或被放弃时移出进行中表（同一 key 可能已登记了新的请求）"""
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+        task = inflight.task
+        if task.done() and not task.cancelled():
+            task.exception()  # 标记异常已被获取，避免等待方全部离开后输出告警
+    
+    async def _request(self, text: str, model: str) -> bytes:
+        """
+        发送 TTS 请求，失败时换端点重试。
+        
         :param text: 要合成的文本
         :param model: TTS 模型名称
         :return: WAV 音频数据
-        :raises: Exception 如果所有重试都失败
         """
         await self.initialize()
         
         self.total_requests += 1
         last_error = None
+        failed: Set[TTSEndpoint] = set()
         
         for attempt in range(self.retry_count + 1):
-            endpoint = self._select_endpoint()
+            # 首次尝试优先发往哈希对应的端点，重试时按负载选择未失败过的端点
+            endpoint = self._hash_select(text, model) if attempt == 0 else None
             if endpoint is None:
-                raise Exception("No available TTS endpoints")
+                endpoint = self._select_endpoint(exclude=failed)
+            if endpoint is None:
+                raise TTSRequestError("unavailable", "No available TTS endpoints")
             
             try:
                 result = await self._do_request(endpoint, text, model)
                 self.successful_requests += 1
                 return result
-            except Exception as e:
+            except TTSRequestError as e:
                 last_error = e
+                failed.add(endpoint)
                 logger.warning(
                     f"TTS request failed (attempt {attempt + 1}/{self.retry_count + 1}): "
                     f"endpoint={endpoint.url}, error={e}"
                 )
                 
                 if attempt < self.retry_count:
-                    # 指数退避
-                    await asyncio.sleep(0.5 * (2 ** attempt))
+                    # 指数退避，加入随机抖动避免并发请求同时重试
+                    delay = 0.5 * (2 ** attempt)
+                    await asyncio.sleep(delay * random.uniform(1 - self.retry_jitter, 1 + self.retry_jitter))
         
         self.failed_requests += 1
-        raise Exception(f"All TTS request attempts failed: {last_error}")
+        raise TTSRequestError(
+            "exhausted",
+            f"All TTS request attempts failed: {last_error}",
+            url=last_error.url,
+            status=last_error.status,
+        ) from last_error
     
     async def _do_request(self, endpoint: TTSEndpoint, text: str, model: str) -> bytes:
         """
@@ -168,30 +354,38 @@ class TTSLoadBalancer:
         :param model: TTS 模型名称
         :return: WAV 音频数据
         """
-        async with self.semaphores[endpoint.url]:
+        async with endpoint.semaphore:
+            if endpoint.current_load == 0:
+                self._idle.discard(endpoint)
             endpoint.current_load += 1
-            endpoint.last_request_time = time.time()
-            start_time = time.time()
+            endpoint.last_request_time = time.monotonic()
+            start_time = time.monotonic()
             
             try:
-                # 构造 OpenAI 兼容的 TTS 请求
-                response = await self.client.post(
+                # 构造 OpenAI 兼容的 TTS 请求；以流式读取响应，状态码异常时不下载响应体
+                async with self.client.stream(
+                    "POST",
                     f"{endpoint.url}/v1/audio/speech",
-                    json={
+                    content=orjson.dumps({
                         "model": model,
                         "input": text,
                         "voice": "alloy",
                         "response_format": "wav",
-                    },
-                    headers={
-                        "Content-Type": "application/json",
-                    },
-                )
-                
-                response.raise_for_status()
+                    }),
+                    headers=JSON_HEADERS,
+                ) as response:
+                    if response.is_error and logger.isEnabledFor(logging.DEBUG):
+                        # 错误响应体可能很大，只在 DEBUG 日志中输出
+                        await response.aread()
+                        logger.debug(f"TTS error response from {endpoint.url}: {response.text}")
+                    response.raise_for_status()
+                    
+                    audio = bytearray()
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                        audio += chunk
                 
                 # 记录成功
-                response_time = time.time() - start_time
+                response_time = time.monotonic() - start_time
                 endpoint.record_success(response_time)
                 
                 logger.debug(
@@ -199,53 +393,78 @@ class TTSLoadBalancer:
                     f"text_len={len(text)}, response_time={response_time:.2f}s"
                 )
                 
-                return response.content
+                return bytes(audio)
                 
             except httpx.HTTPStatusError as e:
                 endpoint.record_failure()
-                raise Exception(f"HTTP error {e.response.status_code}: {e.response.text}")
+                status = e.response.status_code
+                raise TTSRequestError("http", f"HTTP error {status}", url=endpoint.url, status=status) from None
             except httpx.TimeoutException:
                 endpoint.record_failure()
-                raise Exception("Request timeout")
+                raise TTSRequestError("timeout", "Request timeout", url=endpoint.url) from None
             except Exception as e:
                 endpoint.record_failure()
-                raise Exception(f"Request failed: {e}")
+                raise TTSRequestError("other", f"Request failed: {e}", url=endpoint.url) from e
             finally:
                 endpoint.current_load -= 1
+                if endpoint.current_load == 0 and endpoint.is_available:
+                    self._idle.add(endpoint)
     
     async def health_check(self) -> Dict[str, bool]:
         """
-        检查所有端点的健康状态。
+        检查所有端点的健康状态（并发探测所有端点）。
         
         :return: 端点 URL 到健康状态的映射
         """
         await self.initialize()
         
-        results = {}
+        results = await asyncio.gather(*(self._probe(ep) for ep in self.endpoints))
+        return dict(results)
+    
+    async def _probe(self, endpoint: TTSEndpoint) -> Tuple[str, bool]:
+        """
+        探测单个端点的健康状态。
         
-        for endpoint in self.endpoints:
-            try:
-                response = await self.client.get(
-                    f"{endpoint.url}/health",
-                    timeout=10,
-                )
-                is_healthy = response.status_code == 200
-                endpoint.is_available = is_healthy
-                if is_healthy:
-                    endpoint.error_count = 0
-                results[endpoint.url] = is_healthy
-            except Exception as e:
-                logger.warning(f"Health check failed for {endpoint.url}: {e}")
-                results[endpoint.url] = False
+        :param endpoint: 目标端点
+        :return: (端点 URL, 是否健康)
+        """
+        try:
+            response = await self.client.get(
+                f"{endpoint.url}/health",
+                timeout=HEALTH_CHECK_TIMEOUT,
+            )
+            is_healthy = response.status_code == 200
+        except Exception as e:
+            logger.warning(f"Health check failed for {endpoint.url}: {e}")
+            is_healthy = False
         
-        return results
+        endpoint.is_available = is_healthy
+        if is_healthy:
+            endpoint.error_count = 0
+            endpoint.cooldown_until = 0
+            if endpoint.current_load == 0:
+                self._idle.add(endpoint)
+        else:
+            # 与熔断一致进入冷却期，否则下一次选择会因冷却期已过而立即恢复该端点
+            endpoint.cooldown_until = time.monotonic() + ENDPOINT_COOLDOWN
+        return endpoint.url, is_healthy
     
     def get_stats(self) -> Dict:
-        """获取负载均衡器统计信息"""
-        return {
+        """
+        获取负载均衡器统计信息。
+        
+        结果会缓存 STATS_TTL 秒，频繁的健康探测不会每次都重新遍历所有端点。
+        """
+        now = time.monotonic()
+        cached_at, cached = self._stats_cache
+        if cached is not None and now - cached_at < STATS_TTL:
+            return cached
+        
+        stats = {
             "total_requests": self.total_requests,
             "successful_requests": self.successful_requests,
             "failed_requests": self.failed_requests,
+            "deduplicated_requests": self.deduplicated_requests,
             "success_rate": (
                 self.successful_requests / self.total_requests 
                 if self.total_requests > 0 else 0
@@ -256,9 +475,11 @@ class TTSLoadBalancer:
                     "is_available": ep.is_available,
                     "current_load": ep.current_load,
                     "error_count": ep.error_count,
-                    "avg_response_time": ep.avg_response_time,
+                    "avg_response_time": ep.ewma_response_time,
                     "total_requests": ep.total_requests,
                 }
                 for ep in self.endpoints
             ],
-        }
\ No newline at end of file
+        }
+        self._stats_cache = (now, stats)
+        return stats
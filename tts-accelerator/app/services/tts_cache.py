@@ -1,19 +1,25 @@
 """TTS 缓存管理器 - 支持预生成和异步等待"""
 
 import asyncio
-import hashlib
 import time
 import logging
-from typing import Optional, Dict, List
+from collections import OrderedDict, deque
+from typing import Optional, Deque, Dict, List, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
+import xxhash
+
 from .tts_balancer import TTSLoadBalancer
 from .audio_utils import concatenate_wav
 
 logger = logging.getLogger(__name__)
 
 
+# 缓存编码结果的模型名数量上限
+MAX_CACHED_MODEL_NAMES = 64
+
+
 class CacheStatus(Enum):
     """缓存条目状态"""
     PENDING = "pending"        # 待生成
@@ -22,18 +28,29 @@ class CacheStatus(Enum):
     FAILED = "failed"          # 生成失败
 
 
-@dataclass
+@dataclass(slots=True)
 class TTSCacheEntry:
     """TTS 缓存条目"""
     text: str                           # 原文本
     model: str                          # TTS 模型
     audio: Optional[bytes] = None       # 音频数据
     status: CacheStatus = CacheStatus.PENDING
-    created_at: float = field(default_factory=time.time)
+    created_at: float = field(default_factory=time.monotonic)
     completed_at: Optional[float] = None
     error: Optional[str] = None
-    # 用于等待生成完成的事件
-    _event: asyncio.Event = field(default_factory=asyncio.Event)
+    # 生成完成时被置为完成状态的 Future，首次有协程等待时才创建
+    _done: Optional[asyncio.Future] = None
+    
+    def _waiter(self) -> asyncio.Future:
+        """获取（必要时创建）等待生成完成的 Future"""
+        if self._done is None:
+            self._done = asyncio.get_running_loop().create_future()
+        return self._done
+    
+    def _notify(self):
+        """唤醒所有等待生成完成的协程"""
+        if self._done is not None and not self._done.done():
+            self._done.set_result(None)
     
     @property
     def generation_time(self) -> Optional[float]:
@@ -47,8 +64,8 @@ class TTSCacheEntry:
 class SegmentMapping:
     """分段映射信息"""
     full_text: str                    # 完整文本（用于日志和调试）
-    segment_keys: List[str]           # 分段的缓存 key 列表
-    created_at: float = field(default_factory=time.time)
+    segment_keys: List[bytes]         # 分段的缓存 key 列表
+    created_at: float = field(default_factory=time.monotonic)
 
 
 class TTSCacheManager:
@@ -69,6 +86,7 @@ class TTSCacheManager:
         max_size: int = 1000,
         ttl: int = 3600,
         cleanup_interval: int = 300,
+        max_workers: Optional[int] = None,
     ):
         """
         初始化缓存管理器。
@@ -77,56 +95,116 @@ class TTSCacheManager:
         :param max_size: 最大缓存条目数
         :param ttl: 缓存过期时间（秒）
         :param cleanup_interval: 缓存清理间隔（秒）
+        :param max_workers: 并行生成 TTS 的 worker 数，默认为负载均衡器的总并发数
         """
         self.balancer = balancer
         self.max_size = max_size
         self.ttl = ttl
         self.cleanup_interval = cleanup_interval
         
-        # 缓存存储
-        self._cache: Dict[str, TTSCacheEntry] = {}
-        self._lock = asyncio.Lock()
+        # 缓存存储分为两张表：
+        # 已结束（完成或失败）的条目，按最近访问顺序排列，队首为最久未使用的条目
+        self._completed: "OrderedDict[bytes, TTSCacheEntry]" = OrderedDict()
+        # 待生成 / 生成中的条目
+        self._inflight: Dict[bytes, TTSCacheEntry] = {}
+        # 过期队列：按创建顺序记录 (created_at, cache_key)，用于 TTL 清理
+        self._expiry_queue: Deque[Tuple[float, bytes]] = deque()
+        # 缓存状态只在事件循环线程中访问，且所有读写缓存表的代码段内都没有 await，
+        # 不会被其他协程打断，因此无需加锁；修改时需保持这一点
+        
+        # 模型名 → 编码后的 b"model:"，用于计算缓存 key
+        self._model_bytes: Dict[str, bytes] = {}
         
         # 分段映射：完整文本的 cache_key → SegmentMapping
-        self._segment_map: Dict[str, SegmentMapping] = {}
-        self._segment_map_lock = asyncio.Lock()
+        self._segment_map: Dict[bytes, SegmentMapping] = {}
         
         # 统计信息
+        # 缓存中各状态的条目数，在状态变化和条目增删时同步维护
+        self._status_counts: Dict[CacheStatus, int] = {status: 0 for status in CacheStatus}
         self.hit_count = 0
         self.miss_count = 0
         self.concat_hit_count = 0  # 拼接命中次数
+        self.rejected_count = 0  # 缓存已满而未能提交的条目数
         
         # 清理任务
         self._cleanup_task: Optional[asyncio.Task] = None
+        
+        # 生成队列与 worker：待生成的条目按提交顺序排队，由固定数量的 worker 依次生成，
+        # 避免无限制地创建任务。队列长度不超过进行中的条目数，已由 max_size 限制，
+        # 因此队列本身不设上限，入队不会阻塞
+        self.max_workers = max_workers or max(
+            1, len(balancer.endpoints) * balancer.max_concurrent
+        )
+        self._queue: "asyncio.Queue[bytes]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
     
-    def _generate_cache_key(self, text: str, model: str) -> str:
+    def _generate_cache_key(self, text: str, model: str) -> bytes:
         """
         生成缓存 key。
         
         :param text: 文本内容
         :param model: TTS 模型名称
-        :return: SHA256 哈希值
+        :return: 16 字节的 xxh3-128 摘要
+        """
+        # 缓存 key 只用于进程内查找，不需要密码学哈希；xxh3 比 SHA256 快得多。
+        # 分段喂入哈希，避免先拼接 "model:text" 再整体编码带来的额外拷贝
+        model_bytes = self._model_bytes.get(model)
+        if model_bytes is None:
+            # 模型名只有少数几个，编码结果（含分隔符）缓存起来；
+            # 模型名来自客户端请求，限制缓存数量以免被任意名称撑大
+            model_bytes = model.encode() + b":"
+            if len(self._model_bytes) < MAX_CACHED_MODEL_NAMES:
+                self._model_bytes[model] = model_bytes
+        h = xxhash.xxh3_128(model_bytes)
+        h.update(text.encode())
+        # 直接使用原始摘要作为 dict key，省去十六进制编码，哈希和比较也更快
+        return h.digest()
+    
+    def _lookup(self, cache_key: bytes) -> Optional[TTSCacheEntry]:
         """
-        content = f"{model}:{text}"
-        return hashlib.sha256(content.encode()).hexdigest()
+        在两张表中查找缓存条目，命中已结束的条目时更新其访问顺序。
+        
+        :param cache_key: 缓存 key
+        :return: 缓存条目，不存在时返回 None
+        """
+        entry = self._completed.get(cache_key)
+        if entry is not None:
+            self._completed.move_to_end(cache_key)
+            return entry
+        return self._inflight.get(cache_key)
     
     async def start(self):
-        """启动缓存管理器（包括定期清理任务）"""
+        """启动缓存管理器（包括生成 worker 和定期清理任务）"""
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker_loop())
+                for _ in range(self.max_workers)
+            ]
         if self._cleanup_task is None:
             self._cleanup_task = asyncio.create_task(self._cleanup_loop())
-            logger.info("TTS cache manager started")
+            logger.info(f"TTS cache manager started with {self.max_workers} workers")
     
     async def stop(self):
         """停止缓存管理器"""
+        tasks = self._workers
         if self._cleanup_task:
-            self._cleanup_task.cancel()
-            try:
-                await self._cleanup_task
-            except asyncio.CancelledError:
-                pass
-            self._cleanup_task = None
+            tasks = tasks + [self._cleanup_task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._cleanup_task = None
         logger.info("TTS cache manager stopped")
     
+    async def _worker_loop(self):
+        """从生成队列中取出条目并执行 TTS 生成"""
+        while True:
+            cache_key = await self._queue.get()
+            try:
+                await self._generate(cache_key)
+            finally:
+                self._queue.task_done()
+    
     async def _cleanup_loop(self):
         """定期清理过期缓存"""
         while True:
@@ -140,83 +218,165 @@ class TTSCacheManager:
     
     async def _cleanup_expired(self):
         """清理过期的缓存条目"""
-        async with self._lock:
-            now = time.time()
-            expired_keys = [
-                key for key, entry in self._cache.items()
-                if now - entry.created_at > self.ttl
-            ]
-            
-            for key in expired_keys:
-                del self._cache[key]
-            
-            if expired_keys:
-                logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
-        
-        # 清理过期的分段映射
-        async with self._segment_map_lock:
-            now = time.time()
-            expired_mappings = [
-                key for key, mapping in self._segment_map.items()
-                if now - mapping.created_at > self.ttl
-            ]
-            
-            for key in expired_mappings:
-                del self._segment_map[key]
-            
-            if expired_mappings:
-                logger.info(f"Cleaned up {len(expired_mappings)} expired segment mappings")
+        now = time.monotonic()
+        expired_count = 0
+        # 过期队列按创建时间排列，只需从队首弹出已过期的部分
+        while self._expiry_queue and now - self._expiry_queue[0][0] > self.ttl:
+            created_at, key = self._expiry_queue.popleft()
+            for table in (self._completed, self._inflight):
+                entry = table.get(key)
+                # 条目可能已被淘汰，或淘汰后以同一 key 重新创建
+                if entry is not None and entry.created_at == created_at:
+                    del table[key]
+                    self._status_counts[entry.status] -= 1
+                    expired_count += 1
+                    break
+        
+        if expired_count:
+            logger.info(f"Cleaned up {expired_count} expired cache entries")
+        
+        # 清理过期的分段映射（沿用同一时间戳）
+        expired_mappings = [
+            key for key, mapping in self._segment_map.items()
+            if now - mapping.created_at > self.ttl
+        ]
+        
+        for key in expired_mappings:
+            del self._segment_map[key]
+        
+        if expired_mappings:
+            logger.info(f"Cleaned up {len(expired_mappings)} expired segment mappings")
     
-    async def _evict_if_needed(self):
-        """如果缓存满了，淘汰最旧的条目"""
-        if len(self._cache) >= self.max_size:
-            # 按创建时间排序，删除最旧的 10%
-            entries = sorted(
-                self._cache.items(),
-                key=lambda x: x[1].created_at
-            )
-            to_remove = max(1, len(entries) // 10)
+    def _evict_if_needed(self, incoming: int = 1) -> int:
+        """
+        如果缓存放不下即将加入的条目，淘汰最久未使用的条目。
+        
+        进行中的条目同样计入 max_size，但仍有协程在等待，不会被淘汰，只淘汰已结束的条目。
+        
+        :param incoming: 即将加入的条目数
+        :return: 淘汰后还能容纳的条目数
+        """
+        total = len(self._completed) + len(self._inflight)
+        if total + incoming > self.max_size:
+            # 队首为最久未使用的条目，直接删除最久未使用的 10%，且至少腾出 incoming 个位置
+            to_remove = min(max(total // 10, total + incoming - self.max_size), len(self._completed))
             
-            for key, _ in entries[:to_remove]:
-                del self._cache[key]
+            for _ in range(to_remove):
+                _, entry = self._completed.popitem(last=False)
+                self._status_counts[entry.status] -= 1
             
-            logger.info(f"Evicted {to_remove} cache entries due to size limit")
+            if to_remove:
+                logger.info(f"Evicted {to_remove} cache entries due to size limit")
+        
+        return max(0, self.max_size - len(self._completed) - len(self._inflight))
     
-    async def submit(self, text: str, model: str) -> str:
+    async def submit(self, text: str, model: str, cache_key: Optional[bytes] = None) -> bytes:
         """
         提交文本到预生成队列。
         
         :param text: 要合成的文本
         :param model: TTS 模型名称
+        :param cache_key: 已计算好的缓存 key，为 None 时根据 text 和 model 计算
         :return: 缓存 key
         """
-        cache_key = self._generate_cache_key(text, model)
+        if cache_key is None:
+            cache_key = self._generate_cache_key(text, model)
         
-        async with self._lock:
-            # 检查是否已存在
-            if cache_key in self._cache:
-                logger.debug(f"Cache entry already exists: {cache_key[:16]}...")
-                return cache_key
-            
-            # 淘汰旧条目
-            await self._evict_if_needed()
-            
-            # 创建新条目
-            entry = TTSCacheEntry(text=text, model=model)
-            self._cache[cache_key] = entry
+        # 检查是否已存在
+        if self._lookup(cache_key) is not None:
+            logger.debug(f"Cache entry already exists: {cache_key[:8].hex()}...")
+            return cache_key
         
-        # 启动异步生成任务
-        asyncio.create_task(self._generate(cache_key))
+        if self._insert_entry(cache_key, text, model) is None:
+            return cache_key
         
-        logger.debug(f"Submitted TTS generation: {cache_key[:16]}..., text_len={len(text)}")
+        logger.debug(f"Submitted TTS generation: {cache_key[:8].hex()}..., text_len={len(text)}")
         return cache_key
     
+    async def submit_many(self, texts: List[str], model: str) -> List[bytes]:
+        """
+        批量提交文本到预生成队列。
+        
+        :param texts: 要合成的文本列表
+        :param model: TTS 模型名称
+        :return: 与 texts 一一对应的缓存 key 列表
+        """
+        cache_keys = [self._generate_cache_key(text, model) for text in texts]
+        
+        # 找出需要新建的条目（本批次中重复的文本只算一次）；
+        # _lookup 会把已存在的条目移到 LRU 队尾，下面的淘汰不会先删到它们
+        new_entries: Dict[bytes, str] = {}
+        for text, cache_key in zip(texts, cache_keys):
+            if cache_key not in new_entries and self._lookup(cache_key) is None:
+                new_entries[cache_key] = text
+        if not new_entries:
+            return cache_keys
+        
+        # 整个批次只做一次淘汰
+        capacity = self._evict_if_needed(len(new_entries))
+        
+        submitted = 0
+        rejected: List[bytes] = []
+        for cache_key, text in new_entries.items():
+            if submitted < capacity:
+                self._add_entry(cache_key, text, model)
+                submitted += 1
+            else:
+                rejected.append(cache_key)
+        
+        logger.debug(f"Submitted {submitted} TTS generations in batch")
+        if rejected:
+            self.rejected_count += len(rejected)
+            logger.warning(
+                f"TTS cache full of in-flight entries ({len(self._inflight)}), "
+                f"rejected {len(rejected)} of {len(new_entries)} batch entries: "
+                + ", ".join(f"{key[:8].hex()}..." for key in rejected)
+            )
+        return cache_keys
+    
+    def _insert_entry(self, cache_key: bytes, text: str, model: str) -> Optional[TTSCacheEntry]:
+        """
+        淘汰旧条目，创建新的待生成条目并加入生成队列。
+        
+        登记与入队之间没有 await，提交方在此期间被取消也不会留下无人处理的 PENDING 条目。
+        
+        :param cache_key: 缓存 key
+        :param text: 要合成的文本
+        :param model: TTS 模型名称
+        :return: 新创建的缓存条目；缓存已被进行中的条目占满时返回 None
+        """
+        # 淘汰旧条目，仍然没有空间时拒绝提交
+        if not self._evict_if_needed():
+            self.rejected_count += 1
+            logger.warning(
+                f"TTS cache full of in-flight entries ({len(self._inflight)}), "
+                f"rejecting: {cache_key[:8].hex()}..."
+            )
+            return None
+        return self._add_entry(cache_key, text, model)
+    
+    def _add_entry(self, cache_key: bytes, text: str, model: str) -> TTSCacheEntry:
+        """
+        创建新的待生成条目并加入生成队列，调用方需已通过 _evict_if_needed 确认有空间。
+        
+        :param cache_key: 缓存 key
+        :param text: 要合成的文本
+        :param model: TTS 模型名称
+        :return: 新创建的缓存条目
+        """
+        entry = TTSCacheEntry(text=text, model=model)
+        self._inflight[cache_key] = entry
+        self._status_counts[CacheStatus.PENDING] += 1
+        self._expiry_queue.append((entry.created_at, cache_key))
+        self._queue.put_nowait(cache_key)
+        return entry
+    
     async def submit_with_segments(
         self,
         full_text: str,
         segments: List[str],
         model: str,
-    ) -> str:
+    ) -> bytes:
         """
         提交完整文本及其分段到生成队列，并记录映射关系。
         
@@ -227,69 +387,86 @@ class TTSCacheManager:
         """
         full_key = self._generate_cache_key(full_text, model)
         
-        # 提交每个分段（如果还没提交的话）
-        segment_keys = []
-        for seg in segments:
-            if seg and seg.strip():
-                seg_key = await self.submit(seg.strip(), model)
-                segment_keys.append(seg_key)
+        # 批量提交每个分段（如果还没提交的话）
+        segment_keys = await self.submit_many(
+            [seg.strip() for seg in segments if seg and seg.strip()], model
+        )
         
         if not segment_keys:
-            logger.warning(f"No valid segments for full text: {full_key[:16]}...")
+            logger.warning(f"No valid segments for full text: {full_key[:8].hex()}...")
             return full_key
         
         # 记录映射关系
-        async with self._segment_map_lock:
-            self._segment_map[full_key] = SegmentMapping(
-                full_text=full_text[:100] + ("..." if len(full_text) > 100 else ""),
-                segment_keys=segment_keys,
-            )
+        self._segment_map[full_key] = SegmentMapping(
+            full_text=full_text[:100] + ("..." if len(full_text) > 100 else ""),
+            segment_keys=segment_keys,
+        )
         
         logger.info(
-            f"Registered segment mapping: {full_key[:16]}... → "
+            f"Registered segment mapping: {full_key[:8].hex()}... → "
             f"{len(segment_keys)} segments"
         )
         
         return full_key
     
-    async def _generate(self, cache_key: str):
+    async def _generate(self, cache_key: bytes):
         """
         执行 TTS 生成。
         
         :param cache_key: 缓存 key
         """
-        async with self._lock:
-            entry = self._cache.get(cache_key)
-            if entry is None:
-                return
-            entry.status = CacheStatus.GENERATING
+        entry = self._inflight.get(cache_key)
+        if entry is None:
+            return
+        self._set_status(cache_key, entry, CacheStatus.GENERATING)
         
         try:
             # 调用负载均衡器生成 TTS
             audio = await self.balancer.request(entry.text, entry.model)
             
-            async with self._lock:
-                entry = self._cache.get(cache_key)
-                if entry:
-                    entry.audio = audio
-                    entry.status = CacheStatus.COMPLETED
-                    entry.completed_at = time.time()
-                    entry._event.set()
+            # 直接更新持有的条目引用：即使生成期间条目已被淘汰，等待它的协程也能被唤醒
+            entry.audio = audio
+            self._set_status(cache_key, entry, CacheStatus.COMPLETED)
+            entry.completed_at = time.monotonic()
+            self._finish(cache_key, entry)
             
             logger.debug(
-                f"TTS generation completed: {cache_key[:16]}..., "
+                f"TTS generation completed: {cache_key[:8].hex()}..., "
                 f"audio_size={len(audio)}, time={entry.generation_time:.2f}s"
             )
             
         except Exception as e:
-            async with self._lock:
-                entry = self._cache.get(cache_key)
-                if entry:
-                    entry.status = CacheStatus.FAILED
-                    entry.error = str(e)
-                    entry._event.set()
+            self._set_status(cache_key, entry, CacheStatus.FAILED)
+            entry.error = str(e)
+            self._finish(cache_key, entry)
             
-            logger.error(f"TTS generation failed: {cache_key[:16]}..., error={e}")
+            logger.error(f"TTS generation failed: {cache_key[:8].hex()}..., error={e}")
+    
+    def _set_status(self, cache_key: bytes, entry: TTSCacheEntry, status: CacheStatus):
+        """
+        更新进行中条目的状态，条目仍在缓存中时同步更新状态计数。
+        
+        :param cache_key: 缓存 key
+        :param entry: 缓存条目
+        :param status: 新状态
+        """
+        if self._inflight.get(cache_key) is entry:
+            self._status_counts[entry.status] -= 1
+            self._status_counts[status] += 1
+        entry.status = status
+    
+    def _finish(self, cache_key: bytes, entry: TTSCacheEntry):
+        """
+        条目生成结束：从进行中表移入已结束表，并唤醒等待的协程。
+        
+        :param cache_key: 缓存 key
+        :param entry: 已结束的缓存条目
+        """
+        # 生成期间条目可能已过期或被清空，此时只唤醒等待方，不再放回缓存
+        if self._inflight.get(cache_key) is entry:
+            del self._inflight[cache_key]
+            self._completed[cache_key] = entry
+        entry._notify()
     
     async def get(
         self,
@@ -310,13 +487,12 @@ class TTSCacheManager:
         cache_key = self._generate_cache_key(text, model)
         
         # 首先检查是否有分段映射
-        async with self._segment_map_lock:
-            segment_mapping = self._segment_map.get(cache_key)
+        segment_mapping = self._segment_map.get(cache_key)
         
         if segment_mapping:
             # 有分段映射，尝试拼接
             logger.info(
-                f"Found segment mapping for {cache_key[:16]}..., "
+                f"Found segment mapping for {cache_key[:8].hex()}..., "
                 f"concatenating {len(segment_mapping.segment_keys)} segments"
             )
             result = await self._get_concatenated(segment_mapping.segment_keys, timeout)
@@ -324,29 +500,30 @@ class TTSCacheManager:
                 self.concat_hit_count += 1
                 return result
             # 拼接失败，继续尝试其他方式
-            logger.warning(f"Segment concatenation failed for {cache_key[:16]}...")
-        
-        # 检查直接缓存
-        async with self._lock:
-            entry = self._cache.get(cache_key)
+            logger.warning(f"Segment concatenation failed for {cache_key[:8].hex()}...")
         
-        if entry is None:
-            self.miss_count += 1
+        # 优先查找已结束的条目
+        entry = self._completed.get(cache_key)
+        if entry is not None:
+            self._completed.move_to_end(cache_key)
+            self.hit_count += 1
+        else:
+            # 检查进行中的条目，未命中时直接创建条目
+            created = False
+            entry = self._inflight.get(cache_key)
+            if entry is None and generate_if_missing:
+                entry = self._insert_entry(cache_key, text, model)
+                created = entry is not None
             
-            if not generate_if_missing:
+            if created:
+                self.miss_count += 1
+                # 现场生成（条目已在创建时加入生成队列）
+                logger.debug(f"Cache miss, generating on-demand: {cache_key[:8].hex()}...")
+            elif entry is None:
+                self.miss_count += 1
                 return None
-            
-            # 现场生成
-            logger.debug(f"Cache miss, generating on-demand: {cache_key[:16]}...")
-            await self.submit(text, model)
-            
-            async with self._lock:
-                entry = self._cache.get(cache_key)
-        else:
-            self.hit_count += 1
-        
-        if entry is None:
-            return None
+            else:
+                self.hit_count += 1
         
         # 如果已完成，直接返回
         if entry.status == CacheStatus.COMPLETED:
@@ -354,12 +531,14 @@ class TTSCacheManager:
         
         # 如果失败，返回 None
         if entry.status == CacheStatus.FAILED:
-            logger.warning(f"Returning None for failed entry: {cache_key[:16]}...")
+            logger.warning(f"Returning None for failed entry: {cache_key[:8].hex()}...")
             return None
         
         # 等待生成完成
         try:
-            await asyncio.wait_for(entry._event.wait(), timeout=timeout)
+            async with asyncio.timeout(timeout):
+                # shield: 超时只取消本次等待，不取消其他协程共享的 Future
+                await asyncio.shield(entry._waiter())
             
             if entry.status == CacheStatus.COMPLETED:
                 return entry.audio
@@ -367,12 +546,12 @@ class TTSCacheManager:
                 return None
                 
         except asyncio.TimeoutError:
-            logger.warning(f"Timeout waiting for TTS generation: {cache_key[:16]}...")
+            logger.warning(f"Timeout waiting for TTS generation: {cache_key[:8].hex()}...")
             return None
     
     async def _get_concatenated(
         self,
-        segment_keys: List[str],
+        segment_keys: List[bytes],
         timeout: float,
     ) -> Optional[bytes]:
         """
@@ -383,17 +562,17 @@ class TTSCacheManager:
         :return: 拼接后的 WAV 音频数据
         """
         wav_parts = []
-        start_time = time.time()
+        start_time = time.monotonic()
         
         for i, seg_key in enumerate(segment_keys):
             # 计算剩余超时时间
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
             remaining_timeout = max(1, timeout - elapsed)
             
             audio = await self.get_by_key(seg_key, timeout=remaining_timeout)
             if audio is None:
                 logger.warning(
-                    f"Failed to get segment {i+1}/{len(segment_keys)}: {seg_key[:16]}..."
+                    f"Failed to get segment {i+1}/{len(segment_keys)}: {seg_key[:8].hex()}..."
                 )
                 return None
             wav_parts.append(audio)
@@ -410,7 +589,7 @@ class TTSCacheManager:
             logger.error(f"Failed to concatenate audio: {e}")
             return None
     
-    async def get_by_key(self, cache_key: str, timeout: float = 60) -> Optional[bytes]:
+    async def get_by_key(self, cache_key: bytes, timeout: float = 60) -> Optional[bytes]:
         """
         通过缓存 key 获取 TTS 音频。
         
@@ -418,9 +597,7 @@ class TTSCacheManager:
         :param timeout: 等待超时时间（秒）
         :return: WAV 音频数据，如果失败则返回 None
         """
-        async with self._lock:
-            entry = self._cache.get(cache_key)
-        
+        entry = self._lookup(cache_key)
         if entry is None:
             return None
         
@@ -431,22 +608,21 @@ class TTSCacheManager:
             return None
         
         try:
-            await asyncio.wait_for(entry._event.wait(), timeout=timeout)
+            async with asyncio.timeout(timeout):
+                await asyncio.shield(entry._waiter())
             return entry.audio if entry.status == CacheStatus.COMPLETED else None
         except asyncio.TimeoutError:
             return None
     
     def get_stats(self) -> Dict:
         """获取缓存统计信息"""
-        status_counts = {status: 0 for status in CacheStatus}
-        for entry in self._cache.values():
-            status_counts[entry.status] += 1
+        status_counts = self._status_counts
         
         total_requests = self.hit_count + self.miss_count
         hit_rate = self.hit_count / total_requests if total_requests > 0 else 0
         
         return {
-            "total_entries": len(self._cache),
+            "total_entries": len(self._completed) + len(self._inflight),
             "completed_entries": status_counts[CacheStatus.COMPLETED],
             "pending_entries": status_counts[CacheStatus.PENDING],
             "generating_entries": status_counts[CacheStatus.GENERATING],
@@ -455,13 +631,15 @@ class TTSCacheManager:
             "hit_count": self.hit_count,
             "miss_count": self.miss_count,
             "concat_hit_count": self.concat_hit_count,
+            "rejected_count": self.rejected_count,
             "hit_rate": hit_rate,
         }
     
     async def clear(self):
         """清空缓存"""
-        async with self._lock:
-            self._cache.clear()
-        async with self._segment_map_lock:
-            self._segment_map.clear()
+        self._completed.clear()
+        self._inflight.clear()
+        self._status_counts = {status: 0 for status in CacheStatus}
+        self._expiry_queue.clear()
+        self._segment_map.clear()
         logger.info("Cache cleared")
\ No newline at end of file